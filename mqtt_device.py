@@ -1,27 +1,105 @@
 #!/usr/bin/env python3
 import logging
+import os
+import pickle
+import re
+from functools import lru_cache
+import orjson
 import paho.mqtt.client as mqtt
-from ruamel.yaml import YAML
+import yaml
+
+# number-payload patterns, bytes-level so MQTT payloads need no decode first
+_INT_RE = re.compile(rb'-?\d+\Z')
+_FLOAT_RE = re.compile(rb'-?\d*\.\d+\Z')
+
+
+def _try_int_float_conversion(raw: bytes):
+    """Convert a raw MQTT payload to int or float if it looks like a number, else
+    decode it to str. Regex matching avoids raising and catching ValueError on
+    every non-numeric payload.
+    """
+    if _INT_RE.match(raw):
+        return int(raw)
+    if _FLOAT_RE.match(raw):
+        return float(raw)
+    return raw.decode()
+
+
+@lru_cache(maxsize=256)
+def _build_config_message(entity: str, name: str, model: str, manufacturer: str, attr_items: tuple) -> tuple:
+    """Builds one Home Assistant discovery message (topic and payload). Free function
+    taking only hashable arguments, so identical configs are built just once per
+    process; attr_items is the entity's attr dict as tuple(sorted(attr.items())).
+    """
+    attr = dict(attr_items)
+    topic = f'homeassistant/{attr["type"]}/{name}/{entity}/config'
+    d = {"name": f'{name} {attr["name"]}'}
+    if attr["type"] != "button":
+        d["state_topic"] = f'homeassistant/{attr["type"]}/{name}/state'
+        d["availability_topic"] = f'homeassistant/sensor/{name}/availability'
+        d["value_template"] = f'{{{{value_json.{entity}}}}}'
+    if attr["type"] in ("switch", "number", "button"):
+        d["command_topic"] = f'homeassistant/{attr["type"]}/{name}/{entity}'
+    d["unique_id"] = f'{name}_{entity}'
+    for k_src, k_dst in (("device_class", "device_class"), ("state_class", "state_class"),
+                         ("unit", "unit_of_measurement"), ("min", "min"), ("max", "max"),
+                         ("step", "step"), ("mode", "mode")):
+        if k_src in attr:
+            d[k_dst] = attr[k_src]
+    d["device"] = {"identifiers": [name], "name": name, "model": model, "manufacturer": manufacturer}
+    if 'icon' in attr:
+        d["icon"] = f'mdi:{attr["icon"]}'
+    return topic, orjson.dumps(d)
 
 
 class YamlInterface:
-    """Helper class for load and dump yaml files. Preserves comments and quotes.
+    """Helper class for load and dump yaml files. Loads via PyYAML's C loader (libyaml)
+    for speed; dumps via ruamel.yaml to preserve comments and quotes.
     """
-    def __init__(self, filename):
+    # fall back to the pure-Python loader if PyYAML was built without libyaml
+    _LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+    def __init__(self, filename, cache=False):
+        """
+        Args:
+            filename (str): Path of the yaml file
+            cache (bool): Cache the parsed data in a pickle next to the yaml file.
+                Keep off for files holding secrets. Defaults to False.
+        """
         self.filename = filename
-        
-        # create a ruamel.yaml object
-        self._yaml = YAML()
-        self._yaml.preserve_quotes = True
-        
+        self.cache = cache
+
     def load(self):
-        with open(self.filename, 'r') as f:
-            data = self._yaml.load(f)
+        if not self.cache:
+            with open(self.filename, 'rb') as f:
+                return yaml.load(f, Loader=YamlInterface._LOADER)
+        # a pickle cache keyed on (mtime, size) skips the yaml parse for unchanged
+        # files, e.g. in the boot retry loop that reloads until the network is up
+        cache_path = self.filename + '.pkl'
+        st = os.stat(self.filename)
+        key = (st.st_mtime_ns, st.st_size)
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_key, data = pickle.load(f)
+            if cached_key == key:
+                return data
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+        with open(self.filename, 'rb') as f:
+            data = yaml.load(f, Loader=YamlInterface._LOADER)
+        try:
+            with open(cache_path, 'wb') as f:
+                pickle.dump((key, data), f)
+        except OSError:  # the cache is best-effort, e.g. on a read-only filesystem
+            pass
         return data
-    
+
     def dump(self, data):
+        from ruamel.yaml import YAML  # lazy import, so load-only usages don't pay for it
+        ruamel_yaml = YAML()
+        ruamel_yaml.preserve_quotes = True
         with open(self.filename, 'w') as f:
-            self._yaml.dump(data, f)
+            ruamel_yaml.dump(data, f)
     
     
 class MqttDevice:
@@ -31,10 +109,23 @@ class MqttDevice:
         self.manufacturer = manufacturer
         self._entities = entities
         self._on_message_callback = on_message_callback
+        # topics only depend on the fixed device name - build them once
+        self._availability_topic = f'homeassistant/sensor/{name}/availability'
+        self._state_topics = {t: f'homeassistant/{t}/{name}/state' for t in ("sensor", "switch", "number", "button")}
+        # the config messages are static for the process lifetime, so build them only
+        # once; the orjson payloads are bytes already, topics must stay str for paho
+        self._config_cache = [self._make_config_message(entity, attr) for entity, attr in entities.items()]
+        self._setters = [(entity, attr["type"]) for entity, attr in entities.items()
+                         if attr["type"] in ("switch", "number", "button")]
+        self._entities_by_type = {}
+        for entity, attr in entities.items():
+            if attr["type"] in self._state_topics:  # silently ignore unknown types
+                self._entities_by_type.setdefault(attr["type"], []).append(entity)
+        self._last_payload_hash = {}
         self.client = mqtt.Client(client_id=client_id)
         self.client._on_connect = self._on_connect
         self.client._on_message = self._on_message
-        self.client.will_set(f'homeassistant/sensor/{name}/availability', 'offline', retain=True)
+        self.client.will_set(self._availability_topic, 'offline', retain=True)
 
         mqtt_auth = YamlInterface(secrets_path).load()['mqtt_auth']
         self.client.username_pw_set(mqtt_auth['user'], mqtt_auth['password'])
@@ -46,24 +137,33 @@ class MqttDevice:
 
     def exit(self):
         logging.info('Exiting MQTT thread and running cleanup code')
-        self.client.publish(f'homeassistant/sensor/{self.name}/availability', 'offline', retain=True)
+        self.client.publish(self._availability_topic, 'offline', retain=True)
         self.client.disconnect()
         self.client.loop_stop()
 
  
-    def publish_updates(self):
-        for type_ in ("sensor", "switch", "number"):
-            any_update = False
-            payload = '{'
-            for entity, attr in self._entities.items():
-                if attr["type"] == type_:
-                    payload += '"{}": "{}",'.format(entity, attr["value"])
-                    any_update = True
-            if any_update:
-                payload = payload[:-1] + '}'
-                topic = f'homeassistant/{type_}/{self.name}/state'
-                pub_ret = self.client.publish(topic=topic, payload=payload, qos=1, retain=False)
-                logging.debug(f"{pub_ret} from publish(topic={topic}, payload={payload})")            
+    def publish_updates(self, force=False):
+        """Publish the current entity states, one state message per entity type.
+
+        Args:
+            force (bool): Publish even if a payload is unchanged since its last
+                publish. Defaults to False, skipping unchanged payloads.
+        """
+        msgs = []
+        for type_, ents in self._entities_by_type.items():
+            if type_ == "button":  # buttons are stateless
+                continue
+            payload = orjson.dumps({entity: self._entities[entity]["value"] for entity in ents})
+            h = hash(payload)
+            if not force and self._last_payload_hash.get(type_) == h:
+                continue  # unchanged since the last publish
+            self._last_payload_hash[type_] = h
+            msgs.append((self._state_topics[type_], payload))
+        # queue the publishes back-to-back so paho's network thread can flush them
+        # in one loop iteration
+        for topic, payload in msgs:
+            pub_ret = self.client.publish(topic=topic, payload=payload, qos=1, retain=False)
+            logging.debug(f"{pub_ret} from publish(topic={topic}, payload={payload})")
     
     
     def get_states(self):
@@ -82,37 +182,17 @@ class MqttDevice:
             
             
     def _make_config_message(self, entity: str, attr: dict) -> tuple:
-        """Creates MQTT config message (consiting of topic and payload) 
+        """Creates MQTT config message (consiting of topic and payload)
         """
-        topic = f'homeassistant/{attr["type"]}/{self.name}/{entity}/config'
-        payload =  '{'
-        payload += f'"device_class":"{attr["device_class"]}",' if 'device_class' in attr else ''
-        payload += f'"state_class":"{attr["state_class"]}",' if 'state_class' in attr else ''
-        payload += f'"name":"{self.name} {attr["name"]}",'
-        if attr["type"] != "button":
-            payload += f'"state_topic":"homeassistant/{attr["type"]}/{self.name}/state",'
-            payload += f'"availability_topic":"homeassistant/sensor/{self.name}/availability",'
-            payload += f'"value_template":"{{{{value_json.{entity}}}}}",'
-        if attr["type"] in ("switch", "number", "button"):
-            payload += f'"command_topic":"homeassistant/{attr["type"]}/{self.name}/{entity}",'
-        payload += f'"unit_of_measurement":"{attr["unit"]}",' if 'unit' in attr else ''
-        payload += f'"unique_id":"{self.name}_{entity}",'
-        payload += f'"min":"{attr["min"]}",' if 'min' in attr else ''
-        payload += f'"max":"{attr["max"]}",' if 'max' in attr else ''
-        payload += f'"step":"{attr["step"]}",' if 'step' in attr else ''    
-        payload += f'"mode":"{attr["mode"]}",' if 'mode' in attr else ''    
-        payload += f'"device":{{"identifiers":["{self.name}"],"name":"{self.name}","model":"{self.model}", "manufacturer":"{self.manufacturer}"}},'
-        payload += f'"icon":"mdi:{attr["icon"]}"' if 'icon' in attr else ''
-        payload += '}' 
-        return topic, payload
+        return _build_config_message(entity, self.name, self.model, self.manufacturer,
+                                     tuple(sorted(attr.items())))
 
             
     def _publish_config(self):
-        for entity, attr in self._entities.items():
-            topic, payload = self._make_config_message(entity, attr)
-            logging.info(f"publish config topic={topic}, payload={payload}")           
-            self.client.publish(topic=topic, payload=payload, qos=1, retain=True)          
-        self.client.publish(f'homeassistant/sensor/{self.name}/availability', 'online', retain=True)
+        for topic, payload in self._config_cache:
+            logging.info(f"publish config topic={topic}, payload={payload}")
+            self.client.publish(topic=topic, payload=payload, qos=1, retain=True)
+        self.client.publish(self._availability_topic, 'online', retain=True)
 
 
     def _on_connect(self, client, userdata, flags, rc):
@@ -121,9 +201,8 @@ class MqttDevice:
             self.client.subscribe('hass/status')
             self._publish_config()
             self.client.subscribe(f"homeassistant/sensor/{self.name}/command") #subscribe
-            for entity, attrs in self._entities.items():
-                if attrs["type"] in ("switch", "number", "button"):
-                    self.client.subscribe(f"homeassistant/{attrs['type']}/{self.name}/{entity}")  # subscribe to setters
+            for entity, type_ in self._setters:
+                self.client.subscribe(f"homeassistant/{type_}/{self.name}/{entity}")  # subscribe to setters
             self.client.publish(f"homeassistant/sensor/{self.name}/command", "setup", retain=True)
             
         elif rc == 5:
@@ -135,17 +214,7 @@ class MqttDevice:
             
 
     def _on_message(self, client, userdata, message):
-        def try_int_float_conversion(value):
-            if isinstance(value, str):
-                if value.isnumeric():
-                    return(int(value))
-                try:
-                    return(float(value))
-                except ValueError:
-                    pass         
-            return value
-           
-        msg = try_int_float_conversion(message.payload.decode())
+        msg = _try_int_float_conversion(message.payload)
         logging.debug(f"Message received: topic='{message.topic}', message='{msg}'")
         entity = str(message.topic).split("/")[-1]
         if entity in self._entities:
@@ -1,7 +1,69 @@
-import logging, os, serial, time
-from copy import deepcopy
+import asyncio, logging, os, serial, struct, time
+import numpy as np
 from mqtt_device import MqttDevice, YamlInterface
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional - without it the pure-Python decoder is used
+    njit = None
+
+# 256-entry tag lookup table: 1 = signed integer (0x5x), 2 = unsigned integer (0x6x)
+_TAG_KIND = bytes(1 if (b & 0xF0) == 0x50 else 2 if (b & 0xF0) == 0x60 else 0 for b in range(256))
+
+# fixed-width unpackers for the common SML integer widths (key = number of value bytes);
+# other widths fall back to the generic int.from_bytes
+_UNPACK_SIGNED = {1: struct.Struct('>b'), 2: struct.Struct('>h'), 4: struct.Struct('>i'), 8: struct.Struct('>q')}
+_UNPACK_UNSIGNED = {1: struct.Struct('>B'), 2: struct.Struct('>H'), 4: struct.Struct('>I'), 8: struct.Struct('>Q')}
+
+# SML transport-message markers (module-level, so lookups are LOAD_GLOBAL not LOAD_ATTR)
+_START_MESSAGE = b'\x01\x01\x01\x01'
+_ESCAPE_SEQUENCE = b'\x1b\x1b\x1b\x1b'
+_END_MESSAGE = b'\x1a'
+
+
+def _decode(buf, offset):
+    """Decode the integer at the given offset from a uint8 buffer.
+    Numba-compilable twin of SmlClient._get_value_py().
+
+    Args:
+        buf (np.ndarray): SML message as uint8 array
+        offset (int): Offset within the message
+
+    Returns:
+        tuple: (valid, value) - valid is False if there is no integer at the offset
+            or if an unsigned 8-byte value would not fit the int64 value
+    """
+    if len(buf) - offset < 2:
+        return False, 0
+    tag = buf[offset] & 0xF0
+    if tag != 0x50 and tag != 0x60:  # signed integer, unsigned integer
+        return False, 0
+    size = buf[offset] & 0x0F        # size including the 1-byte tag
+    if size > 9 or len(buf) - offset < size:
+        return False, 0              # size nibbles 10-15 exceed the int64 range
+    if tag == 0x60 and size == 9 and buf[offset + 1] & 0x80:
+        return False, 0              # unsigned 8-byte value >= 2**63 doesn't fit int64
+    val = 0
+    for i in range(offset + 1, offset + size):
+        val = (val << 8) | buf[i]
+    if tag == 0x50 and 2 <= size <= 8 and buf[offset + 1] & 0x80:
+        # sign-extend; 8-byte values (size 9) need none, for them the int64
+        # accumulator has already wrapped to the two's-complement value
+        val -= 1 << (8 * (size - 1))
+    return True, val
+
+if njit is not None:
+    _decode = njit(cache=True)(_decode)
+    # one-time self-check of the compiled decoder against Python's unbounded-int
+    # reference - numba's wrapping int64 arithmetic differs on these edge cases
+    for _raw in (b'\x59' + b'\xff' * 8,          # -1 as signed 8-byte
+                 b'\x59\x80' + b'\x00' * 7,      # int64 min
+                 b'\x59\x7f' + b'\xff' * 7,      # int64 max
+                 b'\x55\xff\xff\xfc\x18'):       # -1000 as signed 4-byte
+        _valid, _val = _decode(np.frombuffer(_raw, dtype=np.uint8), 0)
+        _ref = int.from_bytes(_raw[1:], byteorder='big', signed=True)
+        assert _valid and _val == _ref, f"_decode() self-check failed for {_raw.hex()}"
+
 # Constants
 SETTINGS = 'settings.yaml'
 ENTITIES = 'entities.yaml'
@@ -17,10 +79,10 @@ logging.basicConfig(format='%(asctime)s | %(levelname)-7s | %(filename)s line=%(
                               logging.StreamHandler(),], level=LOGLEVEL)
 
 class SmlClient():
-    START_MESSAGE = b'\x01\x01\x01\x01'
-    ESCAPE_SEQUENCE = b'\x1b\x1b\x1b\x1b'
-    END_MESSAGE = b'\x1a'
-        
+    __slots__ = ("_ser", "_max_update_interval", "_entity_names", "_offset_arr",
+                 "_last_values_arr", "_last_time_updated")
+
+
     def __init__(self, offsets: dict, port: str, baudrate: int = 9600, timeout: int = 3, max_update_interval: int = 3600):
         """SML Client constructor
 
@@ -36,9 +98,11 @@ class SmlClient():
         self._ser.reset_input_buffer()
         self._ser.reset_output_buffer()
         self._max_update_interval = max_update_interval
-        self._offsets = offsets    # {'energy_imported': 171, 'energy_exported': 202}
-        self._last_values = {entity: 0 for entity in offsets.keys()}  # initialize to 0
-        self._last_time_updated = time.time()                            
+        # offsets like {'energy_imported': 171, 'energy_exported': 202}, held as parallel arrays
+        self._entity_names = tuple(offsets)
+        self._offset_arr = np.array(list(offsets.values()), dtype=np.int32)
+        self._last_values_arr = np.zeros(len(offsets), dtype=np.int64)  # initialize to 0
+        self._last_time_updated = time.monotonic()
         
         
     def __del__(self):
@@ -58,54 +122,113 @@ class SmlClient():
         """
         # reset input buffer to discard cached data
         self._ser.reset_input_buffer()
-        
-        # search for the 1st escape sequence - it may be for start or end
-        esc = self._ser.read_until(SmlClient.ESCAPE_SEQUENCE)
-        if not esc.endswith(SmlClient.ESCAPE_SEQUENCE):
-            raise ValueError("ESCAPE_SEQUENCE not found!")
-        
-        # search for the packet starting with START_MESSAGE and ending with ESCAPE_SEQUENCE
-        MAX_READ = 5 #limit the number of read attemps to avoid endless loop
-        for _ in range(MAX_READ):
-            msg = self._ser.read_until(SmlClient.ESCAPE_SEQUENCE)
-            if msg.startswith(SmlClient.START_MESSAGE):
-                break
-        else:
-            raise ValueError("START_MESSAGE not found!")
-            
-        
-        # verify that the terminating ESCAPE_SEQUENCE is followed by END_MESSAGE
-        t_end = self._ser.read(4)
-        if not t_end.startswith(SmlClient.END_MESSAGE):
-            raise ValueError("END_MESSAGE not found!")        
-        
-        return msg
+
+        # bulk-read chunks and locate the message markers with find() instead of
+        # pyserial's read_until(), which reads one byte per call
+        start_marker = _ESCAPE_SEQUENCE + _START_MESSAGE
+        esc_len = len(_ESCAPE_SEQUENCE)
+        buf = bytearray()
+        MAX_BUF = 16384  # limit buffering to avoid endless loop on garbage input
+        while len(buf) < MAX_BUF:
+            chunk = self._ser.read(self._ser.in_waiting or 4096)
+            if not chunk:
+                raise ValueError("START_MESSAGE not found!")
+            buf += chunk
+
+            # search for the packet starting with ESCAPE_SEQUENCE + START_MESSAGE
+            start = buf.find(start_marker)
+            if start < 0:
+                continue
+
+            # search for the terminating ESCAPE_SEQUENCE
+            end = buf.find(_ESCAPE_SEQUENCE, start + len(start_marker))
+            if end < 0 or len(buf) <= end + esc_len:
+                continue
+
+            # verify that the terminating ESCAPE_SEQUENCE is followed by END_MESSAGE
+            if buf[end + esc_len] != _END_MESSAGE[0]:
+                raise ValueError("END_MESSAGE not found!")
+
+            return bytes(buf[start + esc_len : end + esc_len])
+
+        raise ValueError("ESCAPE_SEQUENCE not found!")
 
 
     @staticmethod
     def _get_value(msg: bytes, offset: int):
         """Get the integer value from the msg at the given offset.
-        Size and signed-ness are determined automatically
+        Size and signed-ness are determined automatically.
+        Thin wrapper dispatching to the Numba-compiled decoder if available.
 
         Returns:
             bytes: On succes, The extracted integer value.
         """
+        if njit is not None:
+            valid, val = _decode(np.frombuffer(msg, dtype=np.uint8), offset)
+            if valid:
+                return int(val)
+            return
+        return SmlClient._get_value_py(memoryview(msg), offset)
+
+
+    @staticmethod
+    def _get_value_py(msg, offset: int):
+        """Pure-Python fallback for _get_value(), used when Numba is not installed.
+        Accepts bytes or a memoryview; with a memoryview the value slice is a
+        zero-copy window instead of a fresh bytes object.
+        """
         if (len(msg)-offset) < 2:
             return
 
-        if (msg[offset] & 0xF0) in [0x50, 0x60]:  # signed integer, unsigned integer
-            size = (msg[offset] & 0x0F)           # size including the 1-byte tag
+        kind = _TAG_KIND[msg[offset]]
+        if kind:
+            size = (msg[offset] & 0x0F)  # size including the 1-byte tag
             if (len(msg)-offset) >= size:
+                signed = (kind == 1)
+                unpacker = (_UNPACK_SIGNED if signed else _UNPACK_UNSIGNED).get(size - 1)
+                if unpacker is not None:
+                    return unpacker.unpack_from(msg, offset+1)[0]
                 val = msg[offset+1:offset+size]
-                signed = (msg[offset] & 0xF0) == 0x50
                 return int.from_bytes(val, byteorder='big', signed=signed)
-            
-            
-    def read(self): 
+
+
+    @staticmethod
+    def _decode_all(msg: bytes):
+        """Decode all integer candidates within the msg in one structural pass.
+        A single vectorized compare finds every offset whose tag byte marks a signed (0x5x)
+        or unsigned (0x6x) integer, so only those few candidates get decoded.
+
+        Args:
+            msg (bytes): SML Message
+
+        Returns:
+            dict: Candidate offsets as keys, decoded integer values as values
+        """
+        buf = np.frombuffer(msg, dtype=np.uint8)
+        tag = buf & 0xF0
+        candidates = np.flatnonzero((tag == 0x50) | (tag == 0x60)).tolist()
+        values = {}
+        if njit is not None:
+            for offset in candidates:
+                valid, val = _decode(buf, offset)
+                if valid:
+                    values[offset] = int(val)
+        else:
+            mv = memoryview(msg)  # zero-copy slices for the pure-Python decoder
+            for offset in candidates:
+                val = SmlClient._get_value_py(mv, offset)
+                if val is not None:
+                    values[offset] = val
+        return values
+
+
+    def read(self):
         """Reads from the SML interface
 
         Returns:
-            NoneType | dict: Dict with entity keys and values like {'energy_imported': 140, 'energy_exported': 2200}
+            NoneType | tuple: (states, keep_alive), with states a dict with entity keys and values
+                like {'energy_imported': 140, 'energy_exported': 2200}. keep_alive is True when
+                the values are unchanged and only re-emitted because max_update_interval expired.
         """
         try:
             msg = self._read_message()
@@ -113,24 +236,29 @@ class SmlClient():
             logging.warning(f"_read_message() failed with exception {e}")
             return
         
-        change = False
-        for entity, offset in self._offsets.items():
-            val = SmlClient._get_value(msg, offset) 
-            if val is None:
-                logging.warning(f"_get_value() returned None")    
-                return
-            change = change or (val != self._last_values[entity])
-            self._last_values[entity] = val
-        
-        logging.debug(f"change={change}, last_values={self._last_values}")
-        if change or time.time() - self._last_time_updated > self._max_update_interval:
-            self._last_time_updated = time.time()
-            return deepcopy(self._last_values)
+        values = SmlClient._decode_all(msg)
+        try:
+            new = np.array([values[offset] for offset in self._offset_arr.tolist()], dtype=np.int64)
+        except KeyError as e:
+            logging.warning(f"no integer value decoded at offset {e}")
+            return
+        except OverflowError:  # unsigned 8-byte value >= 2**63 doesn't fit int64
+            logging.warning(f"decoded value exceeds the int64 range, values={values}")
+            return
+
+        change = not np.array_equal(new, self._last_values_arr)
+        self._last_values_arr = new
+
+        logging.debug(f"change={change}, last_values={self._last_values_arr}")
+        # short-circuit: the clock is only read when no value changed
+        if change or time.monotonic() - self._last_time_updated > self._max_update_interval:
+            self._last_time_updated = time.monotonic()
+            return dict(zip(self._entity_names, new.tolist())), not change
            
 
 if __name__ == "__main__":
-    settings = YamlInterface(os.path.join(wd, SETTINGS)).load()
-    entities = YamlInterface(os.path.join(wd, ENTITIES)).load()
+    settings = YamlInterface(os.path.join(wd, SETTINGS), cache=True).load()
+    entities = YamlInterface(os.path.join(wd, ENTITIES), cache=True).load()
     
     # Start MqttDevice
     while True:  # this endless loop helps starting the script at raspi boot, when network is not available
@@ -151,15 +279,22 @@ if __name__ == "__main__":
     logging.info(f"Starting SmlClient with {kwargs}")
     sml_client = SmlClient(**kwargs)
     
-    # Endless-loop
-    try: 
+    # Endless-loop. The blocking serial read runs in a worker thread, so it
+    # overlaps with the paho-mqtt network thread instead of stalling it.
+    async def main():
         while True:
-            states = sml_client.read()
-            if states is not None:
+            result = await asyncio.to_thread(sml_client.read)
+            if result is not None:
+                states, keep_alive = result
                 mqtt.set_states(states)
-                mqtt.publish_updates() 
+                # keep-alives re-emit unchanged values after max_update_interval, which
+                # the per-bucket dedupe in publish_updates() would otherwise skip
+                mqtt.publish_updates(force=keep_alive)
                 logging.info(f"MQTT publish: {states}")
-            time.sleep(settings["app"]["polling_interval"])
+            await asyncio.sleep(settings["app"]["polling_interval"])
+
+    try:
+        asyncio.run(main())
     except (Exception, KeyboardInterrupt) as e:
         logging.error(f"Exiting app because of Exception {e}")
     finally:   # teardown 